@@ -0,0 +1,156 @@
+"""
+Numba-compiled nonce search for RageCoin block headers.
+
+The 88-byte header (80-byte prefix + 8-byte little-endian nonce) spans two
+SHA-256 blocks. The first is compressed once into a midstate; each attempt
+only patches the nonce into the final block and runs a single compression.
+"""
+
+import hashlib
+import struct
+from typing import Tuple
+
+import numba
+import numpy as np
+from numba import njit, prange
+
+_HEADER_PREFIX_SIZE = 80
+_NONCE = struct.Struct('<Q')
+# Nonces tried per call into the compiled search
+_BATCH_SIZE = 1 << 20
+# Independent slices of a batch handed to Numba's thread pool
+_CHUNKS = 64
+
+_IV = np.array([
+    0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a,
+    0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19,
+], dtype=np.int64)
+
+_K = np.array([
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+], dtype=np.int64)
+
+
+# Words are held in int64 and masked to 32 bits, which keeps Numba's integer
+# typing simple (no unsigned/signed promotion to float).
+@njit(cache=True, nogil=True)
+def _rotr(x, n):
+    return ((x >> n) | (x << (32 - n))) & 0xFFFFFFFF
+
+
+@njit(cache=True, nogil=True)
+def _compress(state, block, w):
+    """Run one SHA-256 compression of a 16-word block into state, in place"""
+    for t in range(16):
+        w[t] = block[t]
+    for t in range(16, 64):
+        s0 = _rotr(w[t - 15], 7) ^ _rotr(w[t - 15], 18) ^ (w[t - 15] >> 3)
+        s1 = _rotr(w[t - 2], 17) ^ _rotr(w[t - 2], 19) ^ (w[t - 2] >> 10)
+        w[t] = (w[t - 16] + s0 + w[t - 7] + s1) & 0xFFFFFFFF
+
+    a, b, c, d, e, f, g, h = (state[0], state[1], state[2], state[3],
+                              state[4], state[5], state[6], state[7])
+    for t in range(64):
+        s1 = _rotr(e, 6) ^ _rotr(e, 11) ^ _rotr(e, 25)
+        ch = (e & f) ^ (~e & g & 0xFFFFFFFF)
+        t1 = (h + s1 + ch + _K[t] + w[t]) & 0xFFFFFFFF
+        s0 = _rotr(a, 2) ^ _rotr(a, 13) ^ _rotr(a, 22)
+        maj = (a & b) ^ (a & c) ^ (b & c)
+        t2 = (s0 + maj) & 0xFFFFFFFF
+        h = g
+        g = f
+        f = e
+        e = (d + t1) & 0xFFFFFFFF
+        d = c
+        c = b
+        b = a
+        a = (t1 + t2) & 0xFFFFFFFF
+
+    state[0] = (state[0] + a) & 0xFFFFFFFF
+    state[1] = (state[1] + b) & 0xFFFFFFFF
+    state[2] = (state[2] + c) & 0xFFFFFFFF
+    state[3] = (state[3] + d) & 0xFFFFFFFF
+    state[4] = (state[4] + e) & 0xFFFFFFFF
+    state[5] = (state[5] + f) & 0xFFFFFFFF
+    state[6] = (state[6] + g) & 0xFFFFFFFF
+    state[7] = (state[7] + h) & 0xFFFFFFFF
+
+
+@njit(cache=True, nogil=True)
+def _bswap32(x):
+    return (((x & 0xFF) << 24) | ((x & 0xFF00) << 8)
+            | ((x >> 8) & 0xFF00) | ((x >> 24) & 0xFF))
+
+
+@njit(cache=True, nogil=True)
+def _meets_target(state, zero_bits):
+    """Check that the first zero_bits bits of the digest are zero"""
+    for k in range(8):
+        if zero_bits <= 0:
+            return True
+        if zero_bits >= 32:
+            if state[k] != 0:
+                return False
+            zero_bits -= 32
+        else:
+            return (state[k] >> (32 - zero_bits)) == 0
+    return True
+
+
+@njit(cache=True, nogil=True, parallel=True)
+def _search_batch(midstate, template, zero_bits, start, hits):
+    """Flag every nonce in [start, start + len(hits)) whose hash meets the target"""
+    # Each chunk reuses its own scratch buffers instead of allocating per nonce
+    chunk_size = hits.shape[0] // _CHUNKS
+    for chunk in prange(_CHUNKS):
+        block = template.copy()
+        state = np.empty(8, dtype=np.int64)
+        w = np.empty(64, dtype=np.int64)
+        for i in range(chunk * chunk_size, (chunk + 1) * chunk_size):
+            nonce = start + i
+            # The nonce sits little-endian at bytes 16..23 of the final block
+            block[4] = _bswap32(nonce & 0xFFFFFFFF)
+            block[5] = _bswap32((nonce >> 32) & 0xFFFFFFFF)
+            state[:] = midstate
+            _compress(state, block, w)
+            hits[i] = _meets_target(state, zero_bits)
+
+
+def _words(data: bytes) -> np.ndarray:
+    """Split 64 bytes into 16 big-endian SHA-256 message words"""
+    return np.array(struct.unpack('>16I', data), dtype=np.int64)
+
+
+def mine_nonce(header_prefix: bytes, difficulty: int, start: int,
+               threads: int = 0) -> Tuple[int, str]:
+    """Find the first nonce >= start whose header hash has difficulty leading zero hex digits"""
+    if len(header_prefix) != _HEADER_PREFIX_SIZE:
+        raise ValueError(f"Header prefix must be {_HEADER_PREFIX_SIZE} bytes")
+    if threads:
+        numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
+
+    midstate = _IV.copy()
+    _compress(midstate, _words(header_prefix[:64]), np.empty(64, dtype=np.int64))
+
+    # Final block: rest of the prefix, nonce placeholder, padding and the 704-bit length
+    tail = header_prefix[64:] + bytes(_NONCE.size)
+    padded = tail + b'\x80' + bytes(55 - len(tail)) + struct.pack('>Q', 88 * 8)
+    template = _words(padded)
+
+    hits = np.zeros(_BATCH_SIZE, dtype=np.bool_)
+    nonce = start
+    while True:
+        _search_batch(midstate, template, 4 * difficulty, nonce, hits)
+        found = np.flatnonzero(hits)
+        if found.size:
+            nonce += int(found[0])
+            block_hash = hashlib.sha256(header_prefix + _NONCE.pack(nonce)).hexdigest()
+            return nonce, block_hash
+        nonce += _BATCH_SIZE
@@ -0,0 +1,19 @@
+"""
+Start method for RageCoin's worker processes (parallel mining and chain validation).
+"""
+
+import multiprocessing
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def worker_context():
+    """Return the multiprocessing context that worker processes are started from
+
+    A forkserver is used where the platform has one, since forking the node's
+    multi-threaded server process directly can leave a child holding a dead lock;
+    spawn elsewhere. Nothing is set up until the first pool or miner starts.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
@@ -1,7 +1,95 @@
 import hashlib
-import json
+import os
+import queue
+import struct
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from transaction import Transaction
+from _processes import worker_context
+
+# Fixed binary header: index | previous_hash | merkle_root | timestamp, then the nonce.
+# Keeping the nonce in its own trailing field lets mining reuse the hash state of the rest.
+_HEADER_PREFIX = struct.Struct('<Q32s32sd')
+_NONCE = struct.Struct('<Q')
+
+# Below this difficulty a block is found faster than worker processes start up
+PARALLEL_MINING_DIFFICULTY = 5
+# Attempts between checks of the stop event while mining in parallel
+_STOP_CHECK_INTERVAL = 1 << 14
+# Seconds between checks that parallel mining workers are still alive
+_WORKER_POLL_INTERVAL = 0.5
+
+
+# Optional compiled, multi-threaded nonce search (requires numba). Importing numba is
+# slow, so it is only attempted the first time a block is mined in parallel.
+_mine_nonce_jit = None
+_jit_import_attempted = False
+
+
+def _load_jit_miner():
+    """Return the compiled nonce search, or None if numba is not installed"""
+    global _mine_nonce_jit, _jit_import_attempted
+    if not _jit_import_attempted:
+        _jit_import_attempted = True
+        try:
+            from _mining_numba import mine_nonce as _mine_nonce_jit
+        except ImportError:
+            _mine_nonce_jit = None
+    return _mine_nonce_jit
+
+
+def _hash_bytes(hex_hash: str) -> bytes:
+    """Decode a hex hash to 32 raw bytes (the genesis previous hash is just "0")"""
+    return bytes.fromhex(hex_hash.zfill(64))
+
+
+def compute_merkle_root(tx_hashes: List[str]) -> str:
+    """Compute the Merkle root of a list of transaction hashes"""
+    if not tx_hashes:
+        return "0" * 64
+
+    layer = [bytes.fromhex(tx_hash) for tx_hash in tx_hashes]
+    while len(layer) > 1:
+        # Duplicate the last hash on odd-sized layers, as Bitcoin does
+        if len(layer) % 2:
+            layer.append(layer[-1])
+        layer = [hashlib.sha256(layer[i] + layer[i + 1]).digest()
+                 for i in range(0, len(layer), 2)]
+    return layer[0].hex()
+
+
+def _search_nonce(base_hasher, difficulty: int, start: int, step: int = 1,
+                  stop=None) -> Optional[Tuple[int, str]]:
+    """Try nonces start, start + step, ... until one meets the difficulty target
+
+    Returns None if the optional stop event is set before a nonce is found.
+    """
+    # A hash has `difficulty` leading zero hex digits iff its top 4 * difficulty bits are zero
+    shift = 256 - 4 * difficulty
+    from_bytes = int.from_bytes
+    copy = base_hasher.copy
+    pack_nonce = _NONCE.pack
+    nonce = start
+    while True:
+        end = nonce + step * _STOP_CHECK_INTERVAL
+        for nonce in range(nonce, end, step):
+            hasher = copy()
+            hasher.update(pack_nonce(nonce))
+            digest = hasher.digest()
+            if not from_bytes(digest, 'big') >> shift:
+                return nonce, digest.hex()
+        nonce = end
+        if stop is not None and stop.is_set():
+            return None
+
+
+def _mine_worker(header_prefix: bytes, difficulty: int, start: int, step: int,
+                 found, results) -> None:
+    """Search one lane of the nonce space until any worker finds a valid nonce"""
+    result = _search_nonce(hashlib.sha256(header_prefix), difficulty, start, step, found)
+    if result is not None:
+        results.put(result)
+        found.set()
 
 
 class Block:
@@ -14,32 +102,111 @@ class Block:
         self.timestamp = timestamp
         self.previous_hash = previous_hash
         self.nonce = nonce
+        self.merkle_root = self.calculate_merkle_root()
+        self.rebuild_hash_state()
         self.hash = self.calculate_hash()
+        self._verified_hash: Optional[str] = None
+        self._verified_fingerprint: Optional[tuple] = None
+
+    def calculate_merkle_root(self) -> str:
+        """Calculate the Merkle root of the block's transactions"""
+        return compute_merkle_root([Transaction.from_dict(tx).calculate_hash()
+                                    for tx in self.transactions])
+
+    def header_prefix(self) -> bytes:
+        """Serialize the block header up to, but not including, the nonce"""
+        # Only the header is hashed; transactions are committed to through the Merkle root
+        return _HEADER_PREFIX.pack(
+            self.index,
+            _hash_bytes(self.previous_hash),
+            _hash_bytes(self.merkle_root),
+            self.timestamp
+        )
+
+    def rebuild_hash_state(self) -> None:
+        """Hash everything except the nonce once so each attempt only feeds the nonce"""
+        self._base_hasher = hashlib.sha256(self.header_prefix())
 
     def calculate_hash(self) -> str:
         """Calculate the SHA-256 hash of the block"""
-        block_string = json.dumps({
-            "index": self.index,
-            "transactions": self.transactions,
-            "timestamp": self.timestamp,
-            "previous_hash": self.previous_hash,
-            "nonce": self.nonce
-        }, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
-
-    def mine_block(self, difficulty: int) -> None:
-        """Mine the block using Proof of Work"""
-        target = "0" * difficulty
-        while self.hash[:difficulty] != target:
-            self.nonce += 1
-            self.hash = self.calculate_hash()
-        print(f"Block mined: {self.hash}")
+        hasher = self._base_hasher.copy()
+        hasher.update(_NONCE.pack(self.nonce))
+        return hasher.hexdigest()
+
+    def _tx_fingerprint(self) -> tuple:
+        """Snapshot of the hashed fields, cheap to compare against a previous one"""
+        return (self.index, self.timestamp, self.previous_hash, self.merkle_root, self.nonce,
+                tuple(tuple(tx.items()) for tx in self.transactions))
+
+    def mark_verified(self) -> None:
+        """Remember that the block passed full validation in its current state"""
+        self._verified_hash = self.hash
+        self._verified_fingerprint = self._tx_fingerprint()
+
+    def is_verified(self) -> bool:
+        """Check if the block passed validation and has not changed since"""
+        return (self._verified_hash is not None
+                and self._verified_hash == self.hash
+                and self._verified_fingerprint == self._tx_fingerprint())
+
+    def mine_block(self, difficulty: int, workers: Optional[int] = None) -> None:
+        """Mine the block using Proof of Work
+
+        By default the nonce space is split across one worker per CPU once the
+        difficulty reaches PARALLEL_MINING_DIFFICULTY; pass workers=1 to mine in-process.
+        Workers are Numba threads when numba is installed, processes otherwise.
+        """
+        if self.hash[:difficulty] != "0" * difficulty:
+            if workers is None:
+                parallel = difficulty >= PARALLEL_MINING_DIFFICULTY
+                workers = (os.cpu_count() or 1) if parallel else 1
+            mine_nonce_jit = _load_jit_miner() if workers > 1 else None
+            if mine_nonce_jit is not None:
+                self.nonce, self.hash = mine_nonce_jit(self.header_prefix(), difficulty,
+                                                       self.nonce + 1, workers)
+            elif workers > 1:
+                self.nonce, self.hash = self._mine_parallel(difficulty, workers)
+            else:
+                # Transactions never change while mining, so the base hash state is reused
+                self.nonce, self.hash = _search_nonce(self._base_hasher, difficulty, self.nonce + 1)
+
+    def _mine_parallel(self, difficulty: int, workers: int) -> Tuple[int, str]:
+        """Search interleaved nonce lanes in worker processes; the first hit wins"""
+        header_prefix = self.header_prefix()
+        context = worker_context()
+        found = context.Event()
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=_mine_worker,
+                args=(header_prefix, difficulty, self.nonce + 1 + lane, workers, found, results),
+                daemon=True
+            )
+            for lane in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            while True:
+                # Sampled before waiting: any result from a worker that had exited is queued by now
+                exited = all(process.exitcode is not None for process in processes)
+                try:
+                    return results.get(timeout=_WORKER_POLL_INTERVAL)
+                except queue.Empty:
+                    if exited:
+                        codes = [process.exitcode for process in processes]
+                        raise RuntimeError(f"All mining workers exited without a result (exit codes {codes})")
+        finally:
+            found.set()
+            for process in processes:
+                process.join()
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert block to dictionary"""
         return {
             "index": self.index,
             "transactions": self.transactions,
+            "merkle_root": self.merkle_root,
             "timestamp": self.timestamp,
             "previous_hash": self.previous_hash,
             "nonce": self.nonce,
@@ -1,11 +1,25 @@
 import json
+import logging
+import struct
+import threading
+import ijson
 import requests
-from typing import List, Dict, Set
+import urllib3
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 from flask import Flask, jsonify, request
+from waitress import serve
 from blockchain import Blockchain
 from transaction import Transaction
 from block import Block
 
+log = logging.getLogger(__name__)
+
+# Upper bound on concurrent requests to peers (and pooled connections per peer)
+PEER_REQUEST_WORKERS = 16
+# Request handler threads for the node's HTTP server
+NODE_THREADS = 16
+
 
 class Node:
     """P2P network node for the blockchain"""
@@ -15,6 +29,15 @@ class Node:
         self.port = port
         self.blockchain = Blockchain()
         self.peers: Set[str] = set()
+        # Readers iterate an immutable snapshot, rebuilt under the lock on every change
+        self._peers_lock = threading.RLock()
+        self._peers_snapshot: Tuple[str, ...] = ()
+        # Peer requests run concurrently over shared keep-alive connections
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=PEER_REQUEST_WORKERS)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=PEER_REQUEST_WORKERS)
         self.setup_routes()
 
     def setup_routes(self):
@@ -34,10 +57,13 @@ class Node:
             if not miner_address:
                 return jsonify({'message': 'Miner address required'}), 400
 
-            self.blockchain.mine_pending_transactions(miner_address)
+            block = self.blockchain.mine_pending_transactions(miner_address)
+            if block is None:
+                return jsonify({'message': 'Chain was replaced while mining, block discarded'}), 409
+
             return jsonify({
                 'message': 'Block mined successfully',
-                'block': self.blockchain.get_latest_block().to_dict()
+                'block': block.to_dict()
             }), 200
 
         @self.app.route('/transactions/new', methods=['POST'])
@@ -81,14 +107,14 @@ class Node:
             peer = data.get('peer')
 
             if peer:
-                self.peers.add(peer)
+                self.add_peer(peer)
                 return jsonify({'message': f'Peer {peer} registered'}), 201
             return jsonify({'message': 'Invalid peer'}), 400
 
         @self.app.route('/peers', methods=['GET'])
         def get_peers():
             """Get all registered peers"""
-            return jsonify({'peers': list(self.peers)}), 200
+            return jsonify({'peers': list(self._peers_snapshot)}), 200
 
         @self.app.route('/consensus', methods=['GET'])
         def consensus():
@@ -98,59 +124,86 @@ class Node:
                 return jsonify({'message': 'Chain was replaced', 'chain': self.blockchain.to_dict()}), 200
             return jsonify({'message': 'Chain is authoritative', 'chain': self.blockchain.to_dict()}), 200
 
+    def add_peer(self, peer: str) -> None:
+        """Add a peer and publish a new snapshot for readers"""
+        with self._peers_lock:
+            self.peers.add(peer)
+            self._peers_snapshot = tuple(self.peers)
+
+    def _post_transaction(self, peer: str, tx_dict: Dict) -> None:
+        """Send a transaction to one peer, ignoring network errors"""
+        try:
+            self.session.post(f'{peer}/transactions/new', json=tx_dict, timeout=2)
+        except requests.exceptions.RequestException:
+            pass
+
     def broadcast_transaction(self, transaction: Transaction) -> None:
         """Broadcast transaction to all peers"""
-        for peer in self.peers:
-            try:
-                requests.post(f'{peer}/transactions/new', json=transaction.to_dict(), timeout=2)
-            except requests.exceptions.RequestException:
-                pass
+        tx_dict = transaction.to_dict()
+        wait([self.executor.submit(self._post_transaction, peer, tx_dict) for peer in self._peers_snapshot])
+
+    def _stream_chain(self, peer: str, check: Callable[[Iterable[Any]], Any]) -> Any:
+        """Stream a peer's chain through check block by block
+
+        Returns what check returns, or None if the chain could not be fetched or parsed.
+        """
+        try:
+            with self.session.get(f'{peer}/chain', timeout=2, stream=True) as response:
+                if response.status_code != 200:
+                    return None
+                response.raw.decode_content = True
+                return check(ijson.items(response.raw, 'chain.item', use_float=True))
+        except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError,
+                ijson.JSONError, struct.error, TypeError, ValueError):
+            # Network failures and malformed chains both disqualify the peer
+            return None
+
+    def _scan_chain(self, peer: str) -> Optional[int]:
+        """Return the length of a peer's chain if it passes the cheap checks"""
+        return self._stream_chain(peer, self.blockchain.scan_block_stream)
 
     def resolve_conflicts(self) -> bool:
         """Consensus algorithm: replace chain with longest valid chain in network"""
-        new_chain = None
         max_length = len(self.blockchain.chain)
-
-        for peer in self.peers:
-            try:
-                response = requests.get(f'{peer}/chain', timeout=2)
-                if response.status_code == 200:
-                    data = response.json()
-                    length = len(data['chain'])
-                    chain = [Block.from_dict(block) for block in data['chain']]
-
-                    # Check if length is longer and chain is valid
-                    if length > max_length:
-                        temp_blockchain = Blockchain()
-                        temp_blockchain.chain = chain
-                        if temp_blockchain.is_chain_valid():
-                            max_length = length
-                            new_chain = chain
-            except requests.exceptions.RequestException:
-                continue
-
-        if new_chain:
-            self.blockchain.chain = new_chain
-            return True
+        peers = self._peers_snapshot
+
+        # Screen every peer's chain at once, holding nothing but a length per peer
+        lengths = self.executor.map(self._scan_chain, peers)
+        candidates = sorted(
+            ((length, peer) for peer, length in zip(peers, lengths)
+             if length is not None and length > max_length),
+            key=lambda candidate: candidate[0], reverse=True
+        )
+
+        # Only the longest candidate is fetched again, fully validated and built into
+        # Blocks; the next one is tried only if it fails
+        for _, peer in candidates:
+            chain = self._stream_chain(peer, self.blockchain.validate_block_stream)
+            if chain is not None:
+                for block in chain[1:]:
+                    block.mark_verified()
+                # Rechecked under the chain lock, as blocks may have been mined meanwhile
+                return self.blockchain.replace_chain(chain)
 
         return False
 
     def register_with_peer(self, peer_address: str) -> None:
         """Register this node with a peer"""
         try:
-            response = requests.post(
+            response = self.session.post(
                 f'{peer_address}/peers/register',
                 json={'peer': f'http://localhost:{self.port}'},
                 timeout=2
             )
             if response.status_code == 201:
-                self.peers.add(peer_address)
-                print(f"Registered with peer: {peer_address}")
+                self.add_peer(peer_address)
+                log.info("Registered with peer: %s", peer_address)
         except requests.exceptions.RequestException as e:
-            print(f"Failed to register with peer: {e}")
+            log.warning("Failed to register with peer: %s", e)
 
     def run(self, host: str = '0.0.0.0'):
         """Start the node server"""
-        print(f"\nRageCoin node starting on port {self.port}...")
-        print(f"API available at http://localhost:{self.port}")
-        self.app.run(host=host, port=self.port, debug=False)
+        log.info("RageCoin node starting on port %d...", self.port)
+        log.info("API available at http://localhost:%d", self.port)
+        # A single process with a thread pool keeps one blockchain in memory for all requests
+        serve(self.app, host=host, port=self.port, threads=NODE_THREADS)
@@ -5,6 +5,7 @@ Command-line interface for wallet, mining, and blockchain operations
 """
 
 import argparse
+import logging
 import os
 import sys
 from wallet import Wallet
@@ -193,6 +194,9 @@ def main():
 
     args = parser.parse_args()
 
+    # Library modules log through `logging`; show their messages on the console
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
     if args.command == 'wallet-create':
         create_wallet(args)
     elif args.command == 'wallet-show':
@@ -1,26 +1,106 @@
 import hashlib
-import json
+import math
+import struct
+from functools import lru_cache
 from typing import Optional
-from ecdsa import SigningKey, VerifyingKey, SECP256k1, BadSignatureError
+from coincurve import PrivateKey, PublicKey
+
+
+_LENGTH = struct.Struct('<I')
+_AMOUNT = struct.Struct('<d')
+
+
+def _encode_address(address: str) -> bytes:
+    """Encode an address as a tagged, length-prefixed field"""
+    # Public keys are stored as raw bytes; anything else (e.g. COINBASE) as UTF-8.
+    # Only canonical lowercase hex is decoded so that distinct strings never collide.
+    try:
+        raw = bytes.fromhex(address)
+    except ValueError:
+        raw = None
+    if raw is not None and raw.hex() == address:
+        return b'\x00' + _LENGTH.pack(len(raw)) + raw
+    raw = address.encode()
+    return b'\x01' + _LENGTH.pack(len(raw)) + raw
+
+
+def _pack_amount(amount) -> bytes:
+    """Pack an amount as a little-endian double, rejecting amounts a double can't hold exactly"""
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        raise TypeError(f"Amount must be a number, not {type(amount).__name__}")
+    try:
+        value = float(amount)
+    except OverflowError:
+        value = math.inf
+    if not math.isfinite(value) or value != amount:
+        raise ValueError(f"Amount {amount!r} is not exactly representable")
+    # Adding 0.0 turns -0.0 into 0.0, so both sign the same bytes
+    return _AMOUNT.pack(value + 0.0)
+
+
+@lru_cache(maxsize=4096)
+def _hash_fields(sender: str, recipient: str, amount: bytes) -> str:
+    """Hash the signed fields of a transaction, memoized across Transaction objects
+
+    The amount is passed packed so that the cache key is exactly what gets hashed.
+    """
+    tx_bytes = _encode_address(sender) + _encode_address(recipient) + amount
+    return hashlib.sha256(tx_bytes).hexdigest()
+
+
+def _decode_hex(value) -> Optional[bytes]:
+    """Decode a hex string, or return None if it is missing or not valid hex"""
+    try:
+        return bytes.fromhex(value)
+    except (TypeError, ValueError):
+        return None
 
 
 class Transaction:
     """Represents a transaction in the blockchain"""
 
+    # No per-instance __dict__; thousands of these are created per chain validation
+    __slots__ = ("_sender", "_recipient", "_amount", "_signature",
+                 "_sender_key", "_signature_bytes", "_hash")
+
     def __init__(self, sender: str, recipient: str, amount: float, signature: Optional[str] = None):
-        self.sender = sender  # Public key of sender
-        self.recipient = recipient  # Public key of recipient
-        self.amount = amount
+        self._sender = sender  # Public key of sender
+        self._recipient = recipient  # Public key of recipient
+        self._amount = amount
         self.signature = signature
+        # Decoded once: the uncompressed public key (0x04 + x || y)
+        sender_bytes = _decode_hex(sender)
+        self._sender_key = b'\x04' + sender_bytes if sender_bytes else None
+        self._hash: Optional[str] = None
+
+    # The signed fields are read-only, which keeps the cached hash valid
+    @property
+    def sender(self) -> str:
+        return self._sender
+
+    @property
+    def recipient(self) -> str:
+        return self._recipient
+
+    @property
+    def amount(self) -> float:
+        return self._amount
+
+    @property
+    def signature(self) -> Optional[str]:
+        return self._signature
+
+    @signature.setter
+    def signature(self, signature: Optional[str]) -> None:
+        self._signature = signature
+        self._signature_bytes = _decode_hex(signature)
 
     def calculate_hash(self) -> str:
         """Calculate the hash of the transaction"""
-        tx_string = json.dumps({
-            "sender": self.sender,
-            "recipient": self.recipient,
-            "amount": self.amount
-        }, sort_keys=True)
-        return hashlib.sha256(tx_string.encode()).hexdigest()
+        if self._hash is None:
+            self._hash = _hash_fields(self._sender, self._recipient,
+                                      _pack_amount(self._amount))
+        return self._hash
 
     def sign_transaction(self, private_key: str) -> None:
         """Sign the transaction with the sender's private key"""
@@ -28,9 +108,10 @@ class Transaction:
             # Coinbase transactions (mining rewards) don't need signatures
             return
 
-        sk = SigningKey.from_string(bytes.fromhex(private_key), curve=SECP256k1)
+        sk = PrivateKey(bytes.fromhex(private_key))
         tx_hash = self.calculate_hash()
-        signature = sk.sign(tx_hash.encode())
+        # The transaction hash is already a SHA-256 digest, so sign it directly
+        signature = sk.sign(bytes.fromhex(tx_hash), hasher=None)
         self.signature = signature.hex()
 
     def is_valid(self) -> bool:
@@ -38,15 +119,14 @@ class Transaction:
         if self.sender == "COINBASE":
             return True
 
-        if not self.signature:
+        if not self._signature_bytes or not self._sender_key:
             return False
 
         try:
-            vk = VerifyingKey.from_string(bytes.fromhex(self.sender), curve=SECP256k1)
+            vk = PublicKey(self._sender_key)
             tx_hash = self.calculate_hash()
-            vk.verify(bytes.fromhex(self.signature), tx_hash.encode())
-            return True
-        except (BadSignatureError, Exception):
+            return vk.verify(self._signature_bytes, bytes.fromhex(tx_hash), hasher=None)
+        except Exception:
             return False
 
     def to_dict(self) -> dict:
@@ -1,5 +1,5 @@
 import json
-from ecdsa import SigningKey, SECP256k1
+from coincurve import PrivateKey
 from typing import Optional
 
 
@@ -8,20 +8,21 @@ class Wallet:
 
     def __init__(self, private_key: Optional[str] = None):
         if private_key:
-            self.private_key = SigningKey.from_string(bytes.fromhex(private_key), curve=SECP256k1)
+            self.private_key = PrivateKey(bytes.fromhex(private_key))
         else:
             # Generate new key pair
-            self.private_key = SigningKey.generate(curve=SECP256k1)
+            self.private_key = PrivateKey()
 
-        self.public_key = self.private_key.get_verifying_key()
+        self.public_key = self.private_key.public_key
 
     def get_private_key_hex(self) -> str:
         """Get private key as hex string"""
-        return self.private_key.to_string().hex()
+        return self.private_key.secret.hex()
 
     def get_public_key_hex(self) -> str:
         """Get public key (address) as hex string"""
-        return self.public_key.to_string().hex()
+        # Uncompressed point without the 0x04 prefix, as a 64-byte x || y pair
+        return self.public_key.format(compressed=False)[1:].hex()
 
     def get_address(self) -> str:
         """Get wallet address (public key)"""